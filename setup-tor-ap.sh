@@ -47,6 +47,15 @@ TOR_TRANS_PORT=${TOR_TRANS_PORT:-9040}
 TOR_DNS_PORT=${TOR_DNS_PORT:-53}
 #===========================
 
+# PREROUTING redirects managed by this script (without the -A/-C/-D action)
+TOR_NAT_RULES=(
+  "PREROUTING -i ${AP_IFACE} -p tcp --dport 22 -j REDIRECT --to-ports 22"
+  "PREROUTING -i ${AP_IFACE} -p udp --dport 53 -j REDIRECT --to-ports ${TOR_DNS_PORT}"
+  "PREROUTING -i ${AP_IFACE} -p tcp --syn -j REDIRECT --to-ports ${TOR_TRANS_PORT}"
+)
+# Diagnostic labels, one per entry in TOR_NAT_RULES
+TOR_NAT_LABELS=(SSH DNS TCP)
+
 DRY_RUN=0
 UNINSTALL=0
 PSK=""
@@ -127,7 +136,7 @@ ensure_sysctl() {
 }
 
 ensure_hotspot() {
-  if ! ip link show "$AP_IFACE" &>/dev/null; then
+  if [[ ! -e /sys/class/net/$AP_IFACE ]]; then
     error "SENSOR FAILURE: interface $AP_IFACE offline"
     exit 1
   fi
@@ -150,25 +159,42 @@ ensure_torrc() {
     run_cmd "cp '$torrc' '${torrc}.bak'"
   fi
   run_cmd "sed -i '/^TransListenAddress/d;/^DNSListenAddress/d' '$torrc'"
-  ensure_line "$torrc" "Log notice file /var/log/tor/notices.log"
-  ensure_line "$torrc" "VirtualAddrNetwork 10.192.0.0/10"
-  ensure_line "$torrc" "AutomapHostsSuffixes .onion,.exit"
-  ensure_line "$torrc" "AutomapHostsOnResolve 1"
-  ensure_line "$torrc" "TransPort ${AP_GATEWAY}:${TOR_TRANS_PORT}"
-  ensure_line "$torrc" "DNSPort ${AP_GATEWAY}:${TOR_DNS_PORT}"
+  ensure_lines "$torrc" \
+    "Log notice file /var/log/tor/notices.log" \
+    "VirtualAddrNetwork 10.192.0.0/10" \
+    "AutomapHostsSuffixes .onion,.exit" \
+    "AutomapHostsOnResolve 1" \
+    "TransPort ${AP_GATEWAY}:${TOR_TRANS_PORT}" \
+    "DNSPort ${AP_GATEWAY}:${TOR_DNS_PORT}"
   run_cmd "install -m 0644 -o debian-tor -g debian-tor /dev/null /var/log/tor/notices.log"
 }
 
-ensure_line() {
+# Append each missing line to a file, scanning the file only once.
+ensure_lines() {
   local file=$1
-  local line=$2
-  grep -Fqx "$line" "$file" || run_cmd "echo '$line' >> '$file'"
+  shift
+  local line missing rc=0
+  if [[ ! -f $file ]]; then
+    missing=$(printf '%s\n' "$@")
+  else
+    # grep exits 1 when every line is already present; 2 is a real error.
+    missing=$(printf '%s\n' "$@" | grep -Fxv -f "$file") || rc=$?
+    if ((rc > 1)); then
+      error "Unable to read $file"
+      return 1
+    fi
+  fi
+  [[ -n $missing ]] || return 0
+  while IFS= read -r line; do
+    run_cmd "echo '$line' >> '$file'"
+  done <<< "$missing"
 }
 
 ensure_iptables() {
-  iptables_rule "-t nat -A PREROUTING -i ${AP_IFACE} -p tcp --dport 22 -j REDIRECT --to-ports 22"
-  iptables_rule "-t nat -A PREROUTING -i ${AP_IFACE} -p udp --dport 53 -j REDIRECT --to-ports ${TOR_DNS_PORT}"
-  iptables_rule "-t nat -A PREROUTING -i ${AP_IFACE} -p tcp --syn -j REDIRECT --to-ports ${TOR_TRANS_PORT}"
+  local rule
+  for rule in "${TOR_NAT_RULES[@]}"; do
+    iptables_rule "-t nat -A $rule"
+  done
   if ! run_cmd "iptables-save > /etc/iptables/rules.v4"; then
     error "Unable to archive firewall rules to /etc/iptables/rules.v4"
     return 1
@@ -196,22 +222,29 @@ iptables_rule() {
 }
 
 remove_tor_iptables() {
-  iptables_unrule "-t nat -D PREROUTING -i ${AP_IFACE} -p tcp --dport 22 -j REDIRECT --to-ports 22"
-  iptables_unrule "-t nat -D PREROUTING -i ${AP_IFACE} -p udp --dport 53 -j REDIRECT --to-ports ${TOR_DNS_PORT}"
-  iptables_unrule "-t nat -D PREROUTING -i ${AP_IFACE} -p tcp --syn -j REDIRECT --to-ports ${TOR_TRANS_PORT}"
+  local rule
+  for rule in "${TOR_NAT_RULES[@]}"; do
+    iptables_unrule "-t nat -D $rule"
+  done
   run_cmd "iptables-save > /etc/iptables/rules.v4"
   [[ -f /etc/iptables.ipv4.nat ]] && run_cmd "iptables-save > /etc/iptables.ipv4.nat"
 }
 
 start_services() {
   run_cmd "systemctl enable --now tor"
-  for i in {1..30}; do
-    if ip addr show "$AP_IFACE" | grep -q "$AP_GATEWAY"; then
-      run_cmd "systemctl restart tor"
-      break
-    fi
-    sleep 1
-  done
+  if ((DRY_RUN)); then
+    # --dry-run changes nothing, so there is no new address to wait for.
+    run_cmd "systemctl restart tor"
+  else
+    local deadline=$((SECONDS + 30))
+    while ((SECONDS < deadline)); do
+      if ip addr show "$AP_IFACE" | grep -Fq "inet $AP_GATEWAY/"; then
+        run_cmd "systemctl restart tor"
+        break
+      fi
+      sleep 1
+    done
+  fi
   if ! systemctl is-active --quiet tor; then
       warn "ALERT: Tor service inactive; stripping Tor NAT rules."
     remove_tor_iptables
@@ -238,12 +271,13 @@ verify_all() {
   nmcli -t -f NAME,DEVICE,STATE connection show --active | \
     grep -Fxq "tor-ap:${AP_IFACE}:activated" && \
     success "Hotspot link active" || { error "Hotspot link inactive"; ok=0; }
-  iptables -t nat -C PREROUTING -i "${AP_IFACE}" -p tcp --dport 22 -j REDIRECT --to-ports 22 2>/dev/null && \
-    success "SSH redirect engaged" || { error "SSH redirect missing"; ok=0; }
-  iptables -t nat -C PREROUTING -i "${AP_IFACE}" -p udp --dport 53 -j REDIRECT --to-ports "${TOR_DNS_PORT}" 2>/dev/null && \
-    success "DNS redirect engaged" || { error "DNS redirect missing"; ok=0; }
-  iptables -t nat -C PREROUTING -i "${AP_IFACE}" -p tcp --syn -j REDIRECT --to-ports "${TOR_TRANS_PORT}" 2>/dev/null && \
-    success "TCP redirect engaged" || { error "TCP redirect missing"; ok=0; }
+  local i label args
+  for i in "${!TOR_NAT_RULES[@]}"; do
+    label=${TOR_NAT_LABELS[i]}
+    IFS=' ' read -ra args <<< "${TOR_NAT_RULES[i]}"
+    iptables -t nat -C "${args[@]}" 2>/dev/null && \
+      success "$label redirect engaged" || { error "$label redirect missing"; ok=0; }
+  done
   systemctl is-active --quiet tor && \
     success "Tor service active" || { error "Tor service inactive"; ok=0; }
   sysctl -n net.ipv4.ip_forward | grep -Fxq 1 && \
@@ -262,9 +296,10 @@ uninstall() {
   run_cmd "nmcli connection delete 'tor-ap'" || true
   run_cmd "sed -i '/Log notice file \/var\/log\/tor\/notices.log/d;/VirtualAddrNetwork 10.192.0.0\/10/d;/AutomapHostsSuffixes .onion,.exit/d;/AutomapHostsOnResolve 1/d;/TransPort ${AP_GATEWAY}:${TOR_TRANS_PORT}/d;/DNSPort ${AP_GATEWAY}:${TOR_DNS_PORT}/d' '$torrc'"
   [[ -f ${torrc}.bak ]] && run_cmd "mv '${torrc}.bak' '$torrc'"
-  iptables_unrule "-t nat -D PREROUTING -i ${AP_IFACE} -p tcp --dport 22 -j REDIRECT --to-ports 22"
-  iptables_unrule "-t nat -D PREROUTING -i ${AP_IFACE} -p udp --dport 53 -j REDIRECT --to-ports ${TOR_DNS_PORT}"
-  iptables_unrule "-t nat -D PREROUTING -i ${AP_IFACE} -p tcp --syn -j REDIRECT --to-ports ${TOR_TRANS_PORT}"
+  local rule
+  for rule in "${TOR_NAT_RULES[@]}"; do
+    iptables_unrule "-t nat -D $rule"
+  done
   run_cmd "iptables-save > /etc/iptables/rules.v4"
   [[ -f /etc/iptables.ipv4.nat ]] && run_cmd "iptables-save > /etc/iptables.ipv4.nat"
   run_cmd "rm -f /etc/sysctl.d/99-tor-ap.conf"